@@ -14,13 +14,25 @@ DATABASE_USER = os.getenv("DATABASE_USER", "postgres")
 DATABASE_PASSWORD = os.getenv("DATABASE_PASSWORD", "postgres")
 
 DATABASE_URL = f"postgresql://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{DATABASE_NAME}"
+DATABASE_POOL_MIN = int(os.getenv("DATABASE_POOL_MIN", "5"))
+DATABASE_POOL_MAX = int(os.getenv("DATABASE_POOL_MAX", "20"))
 
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = os.getenv("REDIS_PORT", "6379")
-REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}"
+REDIS_SOCKET = os.getenv("REDIS_SOCKET", "/var/run/redis/redis.sock")
+
+if REDIS_HOST in ("localhost", "127.0.0.1") and os.path.exists(REDIS_SOCKET):
+    REDIS_URL = f"unix://{REDIS_SOCKET}"
+else:
+    REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}"
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "64"))
 
 CHANNEL_MIND_UPDATES = "mind_updates"
-CHANNEL_TASKS = "tasks"
 CHANNEL_TASK_RESULTS = "task_results"
 
+# Tasks go through a stream consumed by a group, results stay on pub/sub
+STREAM_TASKS = "tasks"
+STREAM_TASKS_MAXLEN = int(os.getenv("STREAM_TASKS_MAXLEN", "10000"))
+TASKS_GROUP = "workers"
+
 SRID_3D = 4979
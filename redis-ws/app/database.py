@@ -3,9 +3,87 @@ PostgreSQL + PostGIS spatial data operations
 """
 
 import psycopg
-from psycopg.rows import dict_row
+from psycopg.rows import dict_row, tuple_row
+from psycopg_pool import AsyncConnectionPool
 from contextlib import contextmanager
-from app.config import DATABASE_URL, SRID_3D
+from app.config import DATABASE_URL, DATABASE_POOL_MIN, DATABASE_POOL_MAX, SRID_3D
+
+
+pool = AsyncConnectionPool(
+    DATABASE_URL,
+    min_size=DATABASE_POOL_MIN,
+    max_size=DATABASE_POOL_MAX,
+    kwargs={"row_factory": dict_row},
+    open=False
+)
+
+
+SPATIAL_TABLES = {
+    'mentalsphere': 'mentalsphere_spatial_data',
+    'mind': 'mind_spatial_data',
+}
+
+_CREATE_TABLE_TEMPLATE = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id SERIAL PRIMARY KEY,
+        position geometry(PointZ, {srid}),
+        rotation geometry(PointZ, {srid}),
+        scale FLOAT DEFAULT 1.0,
+        created_at TIMESTAMP DEFAULT NOW(),
+        updated_at TIMESTAMP DEFAULT NOW()
+    );
+"""
+
+_INSERT_TEMPLATE = """
+    INSERT INTO {table} (position, rotation, scale, created_at, updated_at)
+    VALUES (
+        ST_SetSRID(ST_MakePoint(%s, %s, %s), {srid}),
+        ST_SetSRID(ST_MakePoint(%s, %s, %s), {srid}),
+        %s,
+        NOW(),
+        NOW()
+    )
+    RETURNING id
+"""
+
+_UPDATE_TEMPLATE = """
+    UPDATE {table}
+    SET
+        position = COALESCE(ST_SetSRID(ST_MakePoint(%s, %s, %s), {srid}), position),
+        rotation = COALESCE(ST_SetSRID(ST_MakePoint(%s, %s, %s), {srid}), rotation),
+        scale = COALESCE(%s, scale),
+        updated_at = NOW()
+    WHERE id = %s
+"""
+
+_SELECT_TEMPLATE = """
+    SELECT ST_X(position), ST_Y(position), ST_Z(position),
+           ST_X(rotation), ST_Y(rotation), ST_Z(rotation),
+           scale
+    FROM {table}
+    WHERE id = %s
+"""
+
+_SELECT_BULK_TEMPLATE = """
+    SELECT id,
+           ST_X(position), ST_Y(position), ST_Z(position),
+           ST_X(rotation), ST_Y(rotation), ST_Z(rotation),
+           scale
+    FROM {table}
+    WHERE id = ANY(%s)
+"""
+
+_DELETE_TEMPLATE = """
+    DELETE FROM {table}
+    WHERE id = %s
+"""
+
+_CREATE_TABLE_SQL = {k: _CREATE_TABLE_TEMPLATE.format(table=t, srid=SRID_3D) for k, t in SPATIAL_TABLES.items()}
+_INSERT_SQL = {k: _INSERT_TEMPLATE.format(table=t, srid=SRID_3D) for k, t in SPATIAL_TABLES.items()}
+_UPDATE_SQL = {k: _UPDATE_TEMPLATE.format(table=t, srid=SRID_3D) for k, t in SPATIAL_TABLES.items()}
+_DELETE_SQL = {k: _DELETE_TEMPLATE.format(table=t) for k, t in SPATIAL_TABLES.items()}
+_SELECT_SQL = {k: _SELECT_TEMPLATE.format(table=t) for k, t in SPATIAL_TABLES.items()}
+_SELECT_BULK_SQL = {k: _SELECT_BULK_TEMPLATE.format(table=t) for k, t in SPATIAL_TABLES.items()}
 
 
 @contextmanager
@@ -22,33 +100,14 @@ def init_database():
         with conn.cursor() as cur:
             cur.execute("CREATE EXTENSION IF NOT EXISTS postgis;")
             
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS mentalsphere_spatial_data (
-                    id SERIAL PRIMARY KEY,
-                    position geometry(PointZ, 4979),
-                    rotation geometry(PointZ, 4979),
-                    scale FLOAT DEFAULT 1.0,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    updated_at TIMESTAMP DEFAULT NOW()
-                );
-            """)
-            
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS mind_spatial_data (
-                    id SERIAL PRIMARY KEY,
-                    position geometry(PointZ, 4979),
-                    rotation geometry(PointZ, 4979),
-                    scale FLOAT DEFAULT 1.0,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    updated_at TIMESTAMP DEFAULT NOW()
-                );
-            """)
+            for sql in _CREATE_TABLE_SQL.values():
+                cur.execute(sql)
             
             conn.commit()
             print("Database tables initialized")
 
 
-def create_spatial_data(position=None, rotation=None, scale=None, object_type='mentalsphere'):
+async def create_spatial_data(position=None, rotation=None, scale=None, object_type='mentalsphere'):
     if position is None:
         position = [0, 0, 0]
     if rotation is None:
@@ -56,83 +115,74 @@ def create_spatial_data(position=None, rotation=None, scale=None, object_type='m
     if scale is None:
         scale = 1.0
     
-    table_name = f"{object_type}_spatial_data"
-    
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(f"""
-                INSERT INTO {table_name} (position, rotation, scale, created_at, updated_at)
-                VALUES (
-                    ST_GeomFromEWKT(%s),
-                    ST_GeomFromEWKT(%s),
-                    %s,
-                    NOW(),
-                    NOW()
-                )
-                RETURNING id
-            """, [
-                f'SRID={SRID_3D};POINT Z({position[0]} {position[1]} {position[2]})',
-                f'SRID={SRID_3D};POINT Z({rotation[0]} {rotation[1]} {rotation[2]})',
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(_INSERT_SQL[object_type], [
+                position[0], position[1], position[2],
+                rotation[0], rotation[1], rotation[2],
                 scale
-            ])
-            spatial_id = cur.fetchone()['id']
-            conn.commit()
+            ], prepare=True)
+            spatial_id = (await cur.fetchone())['id']
+            await conn.commit()
     
     return spatial_id
 
 
-def update_spatial_data(spatial_id, position=None, rotation=None, scale=None, object_type='mentalsphere'):
-    table_name = f"{object_type}_spatial_data"
-    
-    pos_wkt = (
-        f"SRID={SRID_3D};POINT Z({position[0]} {position[1]} {position[2]})"
-        if position is not None
-        else None
-    )
-    rot_wkt = (
-        f"SRID={SRID_3D};POINT Z({rotation[0]} {rotation[1]} {rotation[2]})"
-        if rotation is not None
-        else None
-    )
+async def update_spatial_data(spatial_id, position=None, rotation=None, scale=None, object_type='mentalsphere'):
+    px, py, pz = position[:3] if position is not None else (None, None, None)
+    rx, ry, rz = rotation[:3] if rotation is not None else (None, None, None)
     
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(f"""
-                UPDATE {table_name}
-                SET
-                    position = COALESCE(ST_GeomFromEWKT(%s), position),
-                    rotation = COALESCE(ST_GeomFromEWKT(%s), rotation),
-                    scale = COALESCE(%s, scale),
-                    updated_at = NOW()
-                WHERE id = %s
-            """, [pos_wkt, rot_wkt, scale, spatial_id])
-            conn.commit()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                _UPDATE_SQL[object_type],
+                [px, py, pz, rx, ry, rz, scale, spatial_id],
+                prepare=True
+            )
+            await conn.commit()
 
 
-def get_spatial_data(spatial_id, object_type='mentalsphere'):
-    table_name = f"{object_type}_spatial_data"
-    
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(f"""
-                SELECT ST_AsEWKT(position) as position, ST_AsEWKT(rotation) as rotation, scale
-                FROM {table_name}
-                WHERE id = %s
-            """, [spatial_id])
-            result = cur.fetchone()
+async def delete_spatial_data(spatial_id, object_type='mentalsphere'):
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(_DELETE_SQL[object_type], [spatial_id], prepare=True)
+            await conn.commit()
+
+
+async def get_spatial_data(spatial_id, object_type='mentalsphere'):
+    async with pool.connection() as conn:
+        async with conn.cursor(row_factory=tuple_row) as cur:
+            await cur.execute(_SELECT_SQL[object_type], [spatial_id], prepare=True)
+            result = await cur.fetchone()
             
             if not result:
                 return None
             
-            position_ewkt = result['position']
-            rotation_ewkt = result['rotation']
-            scale = result['scale']
-            
-            position_coords = [float(c) for c in position_ewkt.split('(')[1].rstrip(')').split()]
-            rotation_coords = [float(c) for c in rotation_ewkt.split('(')[1].rstrip(')').split()]
+            px, py, pz, rx, ry, rz, scale = result
             
             return {
-                'position': position_coords,
-                'rotation': rotation_coords,
+                'position': [px, py, pz],
+                'rotation': [rx, ry, rz],
                 'scale': float(scale)
             }
+
+
+async def get_spatial_data_bulk(spatial_ids, object_type='mentalsphere'):
+    """Fetch many rows in one query; returns {spatial_id: spatial dict} for the ids found"""
+    spatial_ids = list(spatial_ids)
+    if not spatial_ids:
+        return {}
+    
+    async with pool.connection() as conn:
+        async with conn.cursor(row_factory=tuple_row) as cur:
+            await cur.execute(_SELECT_BULK_SQL[object_type], [spatial_ids], prepare=True)
+            rows = await cur.fetchall()
+    
+    return {
+        spatial_id: {
+            'position': [px, py, pz],
+            'rotation': [rx, ry, rz],
+            'scale': float(scale)
+        }
+        for spatial_id, px, py, pz, rx, ry, rz, scale in rows
+    }
@@ -1,165 +1,222 @@
 """
 Mind ZODB operations - mirrors Django funcHelper.py
+
+Helpers only mutate root; the caller commits (or aborts) the transaction.
 """
 
 from datetime import datetime
-from persistent.mapping import PersistentMapping
-import transaction
+from BTrees.IIBTree import IITreeSet
+from BTrees.IOBTree import IOBTree
+from BTrees.OOBTree import OOBTree
+from persistent import Persistent
 
 from zodb_module.zodb_management import get_connection
 from zodb_module.objects import MindObject
-from app.database import create_spatial_data, update_spatial_data, get_spatial_data
+from app.database import (
+    create_spatial_data, update_spatial_data, get_spatial_data, get_spatial_data_bulk
+)
+
+
+DEFAULT_SPATIAL = {'position': [0, 0, 0], 'rotation': [0, 0, 0], 'scale': 1.0}
+
+
+def _index_mind(root, mind):
+    user_id = mind.get_created_by()
+    if user_id is None:
+        return
+    
+    mind_ids = root.minds_by_user.get(user_id)
+    if mind_ids is None:
+        mind_ids = root.minds_by_user[user_id] = IITreeSet()
+    mind_ids.add(mind.get_id())
+
+
+def ensure_minds(root):
+    """Return root.minds as an IOBTree, migrating a legacy PersistentMapping in place"""
+    minds = getattr(root, 'minds', None)
+    if isinstance(minds, IOBTree) and hasattr(root, 'minds_by_user'):
+        return minds
+    
+    tree = IOBTree()
+    if minds:
+        tree.update({int(mind_id): mind for mind_id, mind in minds.items()})
+    
+    root.minds = tree
+    root.minds_by_user = OOBTree()
+    for mind in tree.values():
+        _index_mind(root, mind)
+    
+    return tree
 
 
 def get_mind_id(root):
-    if not hasattr(root, 'minds') or not root.minds:
-        return 1
-    existing_ids = [int(key) for key in root.minds.keys() if str(key).isdigit()]
-    return max(existing_ids) + 1 if existing_ids else 1
-
-
-def create_mind_zodb(root, mind_data):
-    try:
-        if not hasattr(root, 'minds'):
-            root.minds = PersistentMapping()
-        
-        mind_id = get_mind_id(root)
-        current_date = datetime.now()
-        
-        spatial_data_id = create_spatial_data(
-            position=mind_data.get('position', [0, 0, 0]),
-            rotation=mind_data.get('rotation', [0, 0, 0]),
-            scale=mind_data.get('scale', 1.0),
-            object_type='mind'
-        )
-        
-        root.minds[mind_id] = MindObject(
-            id=mind_id,
-            name=mind_data.get('name', ''),
-            detail=mind_data.get('detail', ''),
-            color=mind_data.get('color', '#FFFFFF'),
-            spatial_data_id=spatial_data_id,
-            rec_status=mind_data.get('rec_status', True),
-            created_by=mind_data.get('created_by'),
-            mental_sphere_ids=mind_data.get('mental_sphere_ids', []),
-            created_at=current_date
-        )
-        
-        transaction.commit()
-        return mind_id
-    except Exception:
-        transaction.abort()
-        raise
-
-
-def update_mind_zodb(root, mind_id, mind_data):
-    try:
-        if not hasattr(root, 'minds'):
-            root.minds = PersistentMapping()
-        
-        if mind_id not in root.minds:
-            raise ValueError(f"Mind with ID {mind_id} not found")
-        
-        mind = root.minds[mind_id]
-        
-        if 'name' in mind_data:
-            mind.set_name(mind_data['name'])
-        if 'detail' in mind_data:
-            mind.set_detail(mind_data['detail'])
-        if 'color' in mind_data:
-            mind.set_color(mind_data['color'])
-        if 'rec_status' in mind_data:
-            mind.set_rec_status(mind_data['rec_status'])
-        
-        if 'position' in mind_data or 'rotation' in mind_data or 'scale' in mind_data:
-            update_spatial_data(
-                mind.get_spatial_data_id(),
-                position=mind_data.get('position'),
-                rotation=mind_data.get('rotation'),
-                scale=mind_data.get('scale'),
-                object_type='mind'
-            )
-        
-        mind.set_updated_at(datetime.now())
-        transaction.commit()
-        return mind_id
-    except Exception:
-        transaction.abort()
-        raise
-
-
-def get_mind_zodb(root, mind_id):
-    if not hasattr(root, 'minds') or mind_id not in root.minds:
-        return None
+    # Keys are only scanned once, to seed the counter on databases created before it existed
+    seq = getattr(root, 'mind_id_seq', None)
+    if seq is None:
+        existing_ids = [int(key) for key in getattr(root, 'minds', {}).keys() if str(key).isdigit()]
+        seq = max(existing_ids) if existing_ids else 0
+    
+    root.mind_id_seq = seq + 1
+    return root.mind_id_seq
+
+
+async def create_mind_spatial(mind_data):
+    """Insert a new mind's PostGIS row; it commits at once, outside the ZODB transaction"""
+    return await create_spatial_data(
+        position=mind_data.get('position', [0, 0, 0]),
+        rotation=mind_data.get('rotation', [0, 0, 0]),
+        scale=mind_data.get('scale', 1.0),
+        object_type='mind'
+    )
+
+
+async def create_mind_zodb(root, mind_data, now=None, spatial_data_id=None):
+    # Callers that may re-run this on a write conflict pass a spatial row created up front
+    minds = ensure_minds(root)
+    mind_id = get_mind_id(root)
+    current_date = now or datetime.now()
+    
+    if spatial_data_id is None:
+        spatial_data_id = await create_mind_spatial(mind_data)
+    
+    mind = minds[mind_id] = MindObject(
+        id=mind_id,
+        name=mind_data.get('name', ''),
+        detail=mind_data.get('detail', ''),
+        color=mind_data.get('color', '#FFFFFF'),
+        spatial_data_id=spatial_data_id,
+        rec_status=mind_data.get('rec_status', True),
+        created_by=mind_data.get('created_by'),
+        mental_sphere_ids=mind_data.get('mental_sphere_ids', []),
+        created_at=current_date
+    )
+    _index_mind(root, mind)
+    
+    return mind_id
+
+
+async def update_mind_zodb(root, mind_id, mind_data, now=None):
+    minds = ensure_minds(root)
+    if mind_id not in minds:
+        raise ValueError(f"Mind with ID {mind_id} not found")
     
-    mind = root.minds[mind_id]
-    mind_spatial = get_spatial_data(mind.get_spatial_data_id(), object_type='mind')
+    mind = minds[mind_id]
     
-    if not mind_spatial:
-        mind_spatial = {'position': [0, 0, 0], 'rotation': [0, 0, 0], 'scale': 1.0}
+    if 'name' in mind_data:
+        mind.set_name(mind_data['name'])
+    if 'detail' in mind_data:
+        mind.set_detail(mind_data['detail'])
+    if 'color' in mind_data:
+        mind.set_color(mind_data['color'])
+    if 'rec_status' in mind_data:
+        mind.set_rec_status(mind_data['rec_status'])
     
+    if 'position' in mind_data or 'rotation' in mind_data or 'scale' in mind_data:
+        await update_spatial_data(
+            mind.get_spatial_data_id(),
+            position=mind_data.get('position'),
+            rotation=mind_data.get('rotation'),
+            scale=mind_data.get('scale'),
+            object_type='mind'
+        )
+    
+    mind.set_updated_at(now or datetime.now())
+    return mind_id
+
+
+def _serialize_mind(mind, spatial):
     return {
         'id': mind.get_id(),
         'name': mind.get_name(),
         'detail': mind.get_detail(),
         'color': mind.get_color(),
         'rec_status': mind.get_rec_status(),
-        'position': mind_spatial['position'],
-        'rotation': mind_spatial['rotation'],
-        'scale': mind_spatial['scale'],
+        'position': spatial['position'],
+        'rotation': spatial['rotation'],
+        'scale': spatial['scale'],
         'created_by': mind.get_created_by(),
         'mental_sphere_ids': mind.get_mental_sphere_ids(),
-        'created_at': mind.get_created_at().isoformat() if mind.get_created_at() else None,
-        'updated_at': mind.get_updated_at().isoformat() if mind.get_updated_at() else None
+        'created_at': mind.get_created_at(),
+        'updated_at': mind.get_updated_at()
     }
 
 
-def list_minds_zodb(root, user_id=None):
+async def _serialize_minds(minds_tree, selected):
+    # Load every mind, then every sphere set, in one storage round-trip each
+    # instead of one per ghost, and every spatial row in one query
+    jar = getattr(minds_tree, '_p_jar', None)
+    if jar is not None:
+        jar.prefetch(selected)
+        jar.prefetch([
+            mind.mental_sphere_ids for mind in selected
+            if isinstance(mind.mental_sphere_ids, Persistent)
+        ])
+    
+    spatial_map = await get_spatial_data_bulk(
+        {mind.get_spatial_data_id() for mind in selected}, object_type='mind'
+    )
+    return [
+        _serialize_mind(mind, spatial_map.get(mind.get_spatial_data_id()) or DEFAULT_SPATIAL)
+        for mind in selected
+    ]
+
+
+async def get_mind_zodb(root, mind_id):
+    minds = getattr(root, 'minds', None)
+    mind = minds.get(mind_id) if minds is not None else None
+    if mind is None:
+        return None
+    
+    spatial = await get_spatial_data(mind.get_spatial_data_id(), object_type='mind')
+    return _serialize_mind(mind, spatial or DEFAULT_SPATIAL)
+
+
+async def get_minds_zodb(root, mind_ids):
+    """Serialize the existing minds among mind_ids, in order, without per-mind fetches"""
+    minds = getattr(root, 'minds', None)
+    if not minds:
+        return []
+    
+    selected = [mind for mind in (minds.get(mind_id) for mind_id in mind_ids) if mind is not None]
+    return await _serialize_minds(minds, selected)
+
+
+async def list_minds_zodb(root, user_id=None):
     if not hasattr(root, 'minds') or not root.minds:
         return []
     
-    minds = []
-    for mind_id in root.minds.keys():
-        mind = root.minds[mind_id]
-        if user_id is None or mind.get_created_by() == user_id:
-            mind_data = get_mind_zodb(root, mind_id)
-            if mind_data:
-                minds.append(mind_data)
-    
-    return minds
-
-
-def add_mental_spheres_to_mind(root, mind_id, sphere_ids):
-    try:
-        if not hasattr(root, 'minds') or mind_id not in root.minds:
-            raise ValueError(f"Mind with ID {mind_id} not found")
-        
-        mind = root.minds[mind_id]
-        
-        for sphere_id in sphere_ids:
-            mind.add_mental_sphere(sphere_id)
-        
-        mind.set_updated_at(datetime.now())
-        transaction.commit()
-        return mind.get_mental_sphere_ids()
-    except Exception:
-        transaction.abort()
-        raise
-
-
-def delete_mental_spheres_from_mind(root, mind_id, sphere_ids):
-    try:
-        if not hasattr(root, 'minds') or mind_id not in root.minds:
-            raise ValueError(f"Mind with ID {mind_id} not found")
-        
-        mind = root.minds[mind_id]
-        
-        for sphere_id in sphere_ids:
-            mind.remove_mental_sphere(sphere_id)
-        
-        mind.set_updated_at(datetime.now())
-        transaction.commit()
-        return mind.get_mental_sphere_ids()
-    except Exception:
-        transaction.abort()
-        raise
+    minds = root.minds
+    if user_id is None:
+        selected = list(minds.values())
+    elif hasattr(root, 'minds_by_user'):
+        selected = [minds[mind_id] for mind_id in root.minds_by_user.get(user_id, ()) if mind_id in minds]
+    else:
+        selected = [mind for mind in minds.values() if mind.get_created_by() == user_id]
+    
+    return await _serialize_minds(minds, selected)
+
+
+def add_mental_spheres_to_mind(root, mind_id, sphere_ids, now=None):
+    minds = ensure_minds(root)
+    if mind_id not in minds:
+        raise ValueError(f"Mind with ID {mind_id} not found")
+    
+    mind = minds[mind_id]
+    
+    mind.add_mental_spheres(sphere_ids)
+    
+    mind.set_updated_at(now or datetime.now())
+    return mind.get_mental_sphere_ids()
+
+
+def delete_mental_spheres_from_mind(root, mind_id, sphere_ids, now=None):
+    minds = ensure_minds(root)
+    if mind_id not in minds:
+        raise ValueError(f"Mind with ID {mind_id} not found")
+    
+    mind = minds[mind_id]
+    
+    mind.remove_mental_spheres(sphere_ids)
+    
+    mind.set_updated_at(now or datetime.now())
+    return mind.get_mental_sphere_ids()
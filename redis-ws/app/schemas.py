@@ -1,27 +1,31 @@
 """
-Pydantic Schemas
+msgspec Schemas
 """
 
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Annotated, Any, List, Optional
 
+import msgspec
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
 
-class MindUpsert(BaseModel):
+
+class MindUpsert(msgspec.Struct, kw_only=True):
     id: Optional[int] = None
-    name: str = Field(..., min_length=1)
+    name: Annotated[str, msgspec.Meta(min_length=1)]
     detail: str = ""
     color: str = "#FFFFFF"
     rec_status: bool = True
-    position: List[float] = [0, 0, 0]
-    rotation: List[float] = [0, 0, 0]
+    position: List[float] = msgspec.field(default_factory=lambda: [0, 0, 0])
+    rotation: List[float] = msgspec.field(default_factory=lambda: [0, 0, 0])
     scale: float = 1.0
 
 
-class GetMindRequest(BaseModel):
+class GetMindRequest(msgspec.Struct, kw_only=True):
     mind_id_list: List[int]
 
 
-class MindResponse(BaseModel):
+class MindResponse(msgspec.Struct, kw_only=True):
     id: int
     name: str
     detail: str
@@ -32,26 +36,63 @@ class MindResponse(BaseModel):
     scale: float
     created_by: Optional[int] = None
     mental_sphere_ids: List[int] = []
-    created_at: Optional[str] = None
-    updated_at: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
 
 
-class GetMindResponse(BaseModel):
+class GetMindResponse(msgspec.Struct, kw_only=True):
     minds: List[MindResponse]
     count: int
 
 
-class UpsertMindResponse(BaseModel):
+class UpsertMindResponse(msgspec.Struct, kw_only=True):
     message: str
     mind: MindResponse
 
 
-class MentalSphereRequest(BaseModel):
+class MentalSphereRequest(msgspec.Struct, kw_only=True):
     mind_id: int
     sphere_id: List[int]
 
 
-class MentalSphereResponse(BaseModel):
+class MentalSphereResponse(msgspec.Struct, kw_only=True):
     message: str
     mind_id: int
     mental_sphere_ids: List[int]
+
+
+class TaskResult(msgspec.Struct, omit_defaults=True):
+    """Worker reply published on the task results channel"""
+    status: str
+    action: Optional[str]
+    # Echoed back as sent by the client, which may use any JSON value
+    request_id: Any
+    data: Optional[dict] = None
+    error: Optional[str] = None
+
+
+class TaskResultHeader(msgspec.Struct):
+    """Routing fields of a TaskResult; data stays undecoded JSON"""
+    status: Optional[str] = None
+    action: Optional[str] = None
+    request_id: Any = None
+    data: msgspec.Raw = msgspec.Raw(b"null")
+
+
+class StructResponse(Response):
+    """JSON response rendered straight from a msgspec Struct"""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return msgspec.json.encode(content)
+
+
+def json_body(schema: type):
+    """FastAPI dependency decoding the raw request body into `schema`"""
+    async def decode(request: Request):
+        try:
+            return msgspec.json.decode(await request.body(), type=schema)
+        except msgspec.DecodeError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    return decode
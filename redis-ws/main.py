@@ -1,91 +1,191 @@
 import asyncio
-import json
-import uuid
+import itertools
+import logging
+import os
+import threading
 from datetime import datetime
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+import msgspec
+import orjson
 import redis.asyncio as redis
+import transaction
+from ZODB.POSException import ConflictError
 
-from app.config import REDIS_URL, CHANNEL_MIND_UPDATES, CHANNEL_TASKS, CHANNEL_TASK_RESULTS
+from app.config import (
+    REDIS_URL, REDIS_MAX_CONNECTIONS,
+    CHANNEL_MIND_UPDATES, CHANNEL_TASK_RESULTS,
+    STREAM_TASKS, STREAM_TASKS_MAXLEN
+)
 from app.schemas import (
-    MindUpsert, GetMindRequest, GetMindResponse, 
-    UpsertMindResponse, MindResponse, MentalSphereRequest, MentalSphereResponse
+    MindUpsert, GetMindRequest, MindResponse, GetMindResponse, 
+    UpsertMindResponse, MentalSphereRequest, MentalSphereResponse,
+    TaskResultHeader, StructResponse, json_body
 )
 from app.mind_helpers import (
-    get_mind_zodb, list_minds_zodb, 
+    get_mind_zodb, get_minds_zodb, list_minds_zodb, 
     add_mental_spheres_to_mind, delete_mental_spheres_from_mind
 )
-from zodb_module.zodb_management import get_connection, init_zodb, close_zodb
-from app.database import init_database
+from zodb_module.zodb_management import COMMIT_ATTEMPTS, get_db, init_zodb, close_zodb
+from app.database import init_database, pool as db_pool
+
+
+logger = logging.getLogger("mindsim.ws")
 
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
-        self.pending_requests: Dict[str, str] = {}
+        self._uids: List[str] = []
+        self._sockets: List[WebSocket] = []
+        self._index: Dict[str, int] = {}
+        self.pending_requests: Dict[str, WebSocket] = {}
     
     async def connect(self, websocket: WebSocket, user_id: str):
         await websocket.accept()
-        self.active_connections[user_id] = websocket
-        print(f"Client {user_id} connected. Total: {len(self.active_connections)}")
+        if user_id in self._index:
+            self._sockets[self._index[user_id]] = websocket
+        else:
+            self._index[user_id] = len(self._uids)
+            self._uids.append(user_id)
+            self._sockets.append(websocket)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("connect uid=%s total=%d", user_id, len(self._uids))
     
     def disconnect(self, user_id: str):
-        self.active_connections.pop(user_id, None)
-        print(f"Client {user_id} disconnected. Total: {len(self.active_connections)}")
+        i = self._index.pop(user_id, None)
+        if i is not None:
+            last_uid = self._uids.pop()
+            last_socket = self._sockets.pop()
+            if i < len(self._uids):
+                self._uids[i] = last_uid
+                self._sockets[i] = last_socket
+                self._index[last_uid] = i
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("disconnect uid=%s total=%d", user_id, len(self._uids))
     
-    async def send_to_user(self, user_id: str, message: dict):
-        if user_id in self.active_connections:
-            try:
-                await self.active_connections[user_id].send_json(message)
-            except Exception as e:
-                print(f"Error sending to {user_id}: {e}")
+    async def broadcast(self, payload: str, exclude: WebSocket = None):
+        uids = self._uids
+        targets = []
+        sends = []
+        for i, websocket in enumerate(self._sockets):
+            if websocket is not exclude:
+                targets.append(uids[i])
+                sends.append(websocket.send_text(payload))
+        results = await asyncio.gather(*sends, return_exceptions=True)
+        for user_id, result in zip(targets, results):
+            if isinstance(result, Exception):
                 self.disconnect(user_id)
     
-    async def broadcast(self, message: dict, exclude_user: str = None):
-        disconnected = []
-        for user_id, websocket in self.active_connections.items():
-            if user_id != exclude_user:
-                try:
-                    await websocket.send_json(message)
-                except Exception:
-                    disconnected.append(user_id)
-        for user_id in disconnected:
-            self.disconnect(user_id)
-    
-    def register_request(self, request_id: str, user_id: str):
-        self.pending_requests[request_id] = user_id
+    def register_request(self, request_id: str, websocket: WebSocket):
+        self.pending_requests[request_id] = websocket
     
-    def get_request_user(self, request_id: str) -> str:
-        return self.pending_requests.pop(request_id, None)
+    def drop_requests(self, websocket: WebSocket):
+        # Results that never arrive would otherwise pin the closed socket
+        stale = [rid for rid, ws in self.pending_requests.items() if ws is websocket]
+        for request_id in stale:
+            del self.pending_requests[request_id]
 
 
 manager = ConnectionManager()
 
+RESULT_QUEUE_SIZE = 10000
+PUBLISH_QUEUE_SIZE = 10000
+PUBLISH_BATCH_MAX = 128
+SUBSCRIBE_BATCH_MAX = 64
+CLOCK_INTERVAL = 0.01
+
+# The subscriber reads raw bytes, so channels are compared without decoding
+CHANNEL_TASK_RESULTS_B = CHANNEL_TASK_RESULTS.encode()
+CHANNEL_MIND_UPDATES_B = CHANNEL_MIND_UPDATES.encode()
+
+_PREVIEW_TEMPLATE = {
+    "id": "pending",
+    "name": "",
+    "detail": "",
+    "color": "#FFFFFF",
+    "rec_status": True,
+    "position": (0, 0, 0),
+    "rotation": (0, 0, 0),
+    "scale": 1.0,
+    "created_by": None,
+    "mental_sphere_ids": (),
+    "created_at": None,
+    "updated_at": None,
+    "_status": "saving"
+}
+_ACK_FRAME = b'{"type":"ack","request_id":%b,"action":%b,"status":"processing"}'
+_PREVIEW_FRAME = b'{"type":"preview","request_id":%b,"action":%b,"status":"saving","data":{"mind":%b}}'
+_RESPONSE_PREFIX = b'{"type":"response",'
+_UPDATE_FRAME = b'{"type":"update","action":%b,"data":%b}'
+_PREVIEW_FIELDS = ("id", "name", "detail", "color", "rec_status", "position", "rotation", "scale")
+
+_REQ_COUNTER = itertools.count()
+_PID_HEX = f"{os.getpid():x}"
+
+# Wall-clock ISO timestamp refreshed by refresh_clock(); read on the hot path
+_now_iso = datetime.now().isoformat()
+
+# Successful results for these actions are also broadcast to other clients
+BROADCAST_ACTIONS = frozenset({"upsert_mind", "append_mental", "remove_mental"})
+
+_decode_result_header = msgspec.json.Decoder(TaskResultHeader).decode
+_encode_json = msgspec.json.encode
+
+# (request_id, response frame, update frame) handed from the subscriber thread
+ResultItem = Tuple[Optional[str], Optional[str], Optional[str]]
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Starting server...")
+    logger.info("Starting server...")
     init_zodb()
     
     try:
         init_database()
     except Exception as e:
-        print(f"Database init warning: {e}")
+        logger.warning("Database init warning: %s", e)
+    await db_pool.open()
     
-    asyncio.create_task(redis_result_subscriber())
+    app.state.redis = redis.from_url(REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS)
+    app.state.result_queue = asyncio.Queue(maxsize=RESULT_QUEUE_SIZE)
+    app.state.publish_queue = asyncio.Queue(maxsize=PUBLISH_QUEUE_SIZE)
+    publisher = asyncio.create_task(
+        redis_publisher(app.state.redis, app.state.publish_queue)
+    )
+    
+    subscriber_loop = asyncio.new_event_loop()
+    subscriber_thread = threading.Thread(
+        target=run_subscriber_loop, args=(subscriber_loop,),
+        name="redis-subscriber", daemon=True
+    )
+    subscriber_thread.start()
+    asyncio.run_coroutine_threadsafe(
+        redis_result_subscriber(asyncio.get_running_loop(), app.state.result_queue),
+        subscriber_loop
+    )
+    dispatcher = asyncio.create_task(dispatch_results(app.state.result_queue))
+    clock = asyncio.create_task(refresh_clock())
     
     yield
     
-    print("Shutting down...")
+    logger.info("Shutting down...")
+    subscriber_loop.call_soon_threadsafe(subscriber_loop.stop)
+    await asyncio.to_thread(subscriber_thread.join, 5)
+    dispatcher.cancel()
+    publisher.cancel()
+    clock.cancel()
+    await app.state.redis.aclose()
+    await db_pool.close()
     close_zodb()
 
 
 app = FastAPI(
     title="MindSim Real-time API",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -98,55 +198,132 @@ app.add_middleware(
 )
 
 
-async def redis_result_subscriber():
+def run_subscriber_loop(loop: asyncio.AbstractEventLoop):
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_forever()
+    finally:
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.close()
+
+
+def enqueue_results(queue: asyncio.Queue, items: List[ResultItem]):
+    for item in items:
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            logger.warning("Result queue full, dropping: %s", item[0])
+
+
+def encode_result_message(message: dict) -> Optional[ResultItem]:
+    raw = message["data"]
+    channel = message["channel"]
+    
+    if channel == CHANNEL_TASK_RESULTS_B:
+        # The worker's JSON is forwarded as-is; only the routing fields are decoded
+        header = _decode_result_header(raw)
+        response = (_RESPONSE_PREFIX + raw[1:]).decode()
+        update = None
+        
+        if header.action in BROADCAST_ACTIONS and header.status == "success":
+            update = (_UPDATE_FRAME % (_encode_json(header.action), header.data)).decode()
+        
+        return header.request_id, response, update
+    
+    elif channel == CHANNEL_MIND_UPDATES_B:
+        return None, None, (_UPDATE_FRAME % (b'"mind_updated"', raw)).decode()
+    
+    return None
+
+
+async def redis_result_subscriber(main_loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+    # Runs on the subscriber thread's loop; only hands encoded frames to main_loop
+    redis_client = redis.from_url(REDIS_URL, protocol=3)
+    pubsub = redis_client.pubsub()
     try:
-        redis_client = redis.from_url(REDIS_URL)
-        pubsub = redis_client.pubsub()
         await pubsub.subscribe(CHANNEL_TASK_RESULTS, CHANNEL_MIND_UPDATES)
         
-        print(f"Subscribed to: {CHANNEL_TASK_RESULTS}, {CHANNEL_MIND_UPDATES}")
+        logger.info("Subscribed to: %s, %s", CHANNEL_TASK_RESULTS, CHANNEL_MIND_UPDATES)
         
-        async for message in pubsub.listen():
-            if message["type"] == "message":
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is None:
+                continue
+            
+            batch = [message]
+            while len(batch) < SUBSCRIBE_BATCH_MAX:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0)
+                if message is None:
+                    break
+                batch.append(message)
+            
+            items = []
+            for message in batch:
+                if message["type"] != "message":
+                    continue
                 try:
-                    data = json.loads(message["data"])
-                    channel = message["channel"].decode() if isinstance(message["channel"], bytes) else message["channel"]
-                    
-                    if channel == CHANNEL_TASK_RESULTS:
-                        request_id = data.get("request_id")
-                        user_id = manager.get_request_user(request_id)
-                        
-                        if user_id:
-                            await manager.send_to_user(user_id, {
-                                "type": "response",
-                                "request_id": request_id,
-                                "action": data.get("action"),
-                                "status": data.get("status"),
-                                "data": data.get("data"),
-                                "error": data.get("error")
-                            })
-                        
-                        if data.get("action") in ["upsert_mind", "append_mental", "remove_mental"] and data.get("status") == "success":
-                            await manager.broadcast({
-                                "type": "update",
-                                "action": data.get("action"),
-                                "data": data.get("data")
-                            }, exclude_user=user_id)
-                    
-                    elif channel == CHANNEL_MIND_UPDATES:
-                        await manager.broadcast({
-                            "type": "update",
-                            "action": "mind_updated",
-                            "data": data
-                        })
-                        
-                except json.JSONDecodeError:
-                    print(f"Invalid JSON: {message['data']}")
-                except Exception as e:
-                    print(f"Error processing message: {e}")
+                    item = encode_result_message(message)
+                    if item is not None:
+                        items.append(item)
+                except msgspec.DecodeError:
+                    logger.warning("Invalid JSON: %r", message["data"])
+                except Exception:
+                    logger.exception("Error processing message")
+            
+            if items:
+                main_loop.call_soon_threadsafe(enqueue_results, queue, items)
                     
     except Exception as e:
-        print(f"Redis subscriber error: {e}")
+        logger.error("Redis subscriber error: %s", e)
+    finally:
+        await pubsub.aclose()
+        await redis_client.aclose()
+
+
+async def dispatch_results(queue: asyncio.Queue):
+    while True:
+        request_id, response, update = await queue.get()
+        websocket = None
+        
+        if response is not None:
+            websocket = manager.pending_requests.pop(request_id, None)
+            if websocket is not None:
+                try:
+                    await websocket.send_text(response)
+                except Exception as e:
+                    logger.warning("Error sending response %s: %s", request_id, e)
+        
+        if update is not None:
+            await manager.broadcast(update, exclude=websocket)
+
+
+def new_request_id() -> str:
+    return f"{_PID_HEX}-{next(_REQ_COUNTER):x}"
+
+
+async def refresh_clock():
+    global _now_iso
+    while True:
+        _now_iso = datetime.now().isoformat()
+        await asyncio.sleep(CLOCK_INTERVAL)
+
+
+async def redis_publisher(redis_client: redis.Redis, queue: asyncio.Queue):
+    while True:
+        items = [await queue.get()]
+        while len(items) < PUBLISH_BATCH_MAX and not queue.empty():
+            items.append(queue.get_nowait())
+        
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for payload in items:
+                    pipe.xadd(STREAM_TASKS, {"data": payload}, maxlen=STREAM_TASKS_MAXLEN, approximate=True)
+                await pipe.execute()
+        except Exception as e:
+            logger.error("Redis publish error (%d dropped): %s", len(items), e)
 
 
 @app.websocket("/ws/{user_id}")
@@ -154,89 +331,91 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
     await manager.connect(websocket, user_id)
     
     try:
-        redis_client = redis.from_url(REDIS_URL)
-        
         while True:
-            raw_data = await websocket.receive_text()
-            message = json.loads(raw_data)
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            message = orjson.loads(frame.get("bytes") or frame["text"])
             
             action = message.get("action")
             data = message.get("data", {})
-            request_id = message.get("request_id") or str(uuid.uuid4())
+            request_id = message.get("request_id") or new_request_id()
+            
+            manager.register_request(request_id, websocket)
             
-            manager.register_request(request_id, user_id)
+            timestamp = _now_iso
             
             if action == "upsert_mind":
-                preview_mind = {
-                    "id": data.get("id") or "pending",
-                    "name": data.get("name", ""),
-                    "detail": data.get("detail", ""),
-                    "color": data.get("color", "#FFFFFF"),
-                    "rec_status": data.get("rec_status", True),
-                    "position": data.get("position", [0, 0, 0]),
-                    "rotation": data.get("rotation", [0, 0, 0]),
-                    "scale": data.get("scale", 1.0),
-                    "created_by": None,
-                    "mental_sphere_ids": [],
-                    "created_at": datetime.now().isoformat(),
-                    "updated_at": datetime.now().isoformat(),
-                    "_status": "saving"
-                }
-                await websocket.send_json({
-                    "type": "preview",
-                    "request_id": request_id,
-                    "action": action,
-                    "status": "saving",
-                    "data": {"mind": preview_mind}
-                })
+                preview_mind = _PREVIEW_TEMPLATE.copy()
+                preview_mind.update({k: data[k] for k in _PREVIEW_FIELDS if k in data})
+                preview_mind["id"] = preview_mind["id"] or "pending"
+                preview_mind["created_at"] = preview_mind["updated_at"] = timestamp
+                frame = _PREVIEW_FRAME % (
+                    orjson.dumps(request_id), orjson.dumps(action), orjson.dumps(preview_mind)
+                )
             else:
-                await websocket.send_json({
-                    "type": "ack",
-                    "request_id": request_id,
-                    "action": action,
-                    "status": "processing"
-                })
+                frame = _ACK_FRAME % (orjson.dumps(request_id), orjson.dumps(action))
+            await websocket.send_text(frame.decode())
             
             task = {
                 "action": action,
                 "data": data,
                 "request_id": request_id,
                 "user_id": user_id,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": timestamp
             }
             
-            await redis_client.publish(CHANNEL_TASKS, json.dumps(task))
+            await app.state.publish_queue.put(orjson.dumps(task))
             
     except WebSocketDisconnect:
         manager.disconnect(user_id)
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        logger.warning("WebSocket error: %s", e)
         manager.disconnect(user_id)
+    finally:
+        manager.drop_requests(websocket)
+
 
+async def run_write(work):
+    """Await work(root) in its own transaction, re-running it on write conflicts"""
+    for attempt in range(1, COMMIT_ATTEMPTS + 1):
+        # Not db.transaction(): its __exit__ skips close() when commit() raises
+        tm = transaction.TransactionManager()
+        conn = get_db().open(tm)
+        try:
+            tm.begin()
+            result = await work(conn.root())
+            tm.commit()
+            return result
+        except ConflictError:
+            if attempt == COMMIT_ATTEMPTS:
+                raise
+            logger.info("Write conflict, retrying (%d/%d)", attempt, COMMIT_ATTEMPTS)
+        finally:
+            tm.abort()
+            conn.close()
 
-@app.post("/api/get_mind", response_model=GetMindResponse)
-async def get_mind_endpoint(request: GetMindRequest):
+
+@app.post("/api/get_mind")
+async def get_mind_endpoint(request: GetMindRequest = Depends(json_body(GetMindRequest))):
     try:
-        _, root = get_connection()
-        minds = []
-        
-        for mind_id in request.mind_id_list:
-            mind_data = get_mind_zodb(root, int(mind_id))
-            if mind_data:
-                minds.append(mind_data)
+        with get_db().transaction() as conn:
+            minds = await get_minds_zodb(conn.root(), request.mind_id_list)
         
-        return GetMindResponse(minds=minds, count=len(minds))
+        return StructResponse(GetMindResponse(
+            minds=[MindResponse(**m) for m in minds],
+            count=len(minds)
+        ))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/upsert_mind", response_model=UpsertMindResponse)
-async def upsert_mind_endpoint(request: MindUpsert):
-    from app.mind_helpers import create_mind_zodb, update_mind_zodb
+@app.post("/api/upsert_mind")
+async def upsert_mind_endpoint(request: MindUpsert = Depends(json_body(MindUpsert))):
+    from app.mind_helpers import create_mind_spatial, create_mind_zodb, update_mind_zodb
+    from app.database import delete_spatial_data
     
     try:
-        _, root = get_connection()
-        
         mind_data = {
             'name': request.name,
             'detail': request.detail,
@@ -248,21 +427,30 @@ async def upsert_mind_endpoint(request: MindUpsert):
             'created_by': 1
         }
         
-        if request.id:
-            mind_id = update_mind_zodb(root, request.id, mind_data)
-        else:
-            mind_id = create_mind_zodb(root, mind_data)
+        # Created once, so a conflict retry reuses the row instead of inserting another
+        spatial_data_id = None if request.id else await create_mind_spatial(mind_data)
         
-        mind = get_mind_zodb(root, mind_id)
+        async def save(root):
+            if request.id:
+                mind_id = await update_mind_zodb(root, request.id, mind_data)
+            else:
+                mind_id = await create_mind_zodb(root, mind_data, spatial_data_id=spatial_data_id)
+            return await get_mind_zodb(root, mind_id)
+        
+        # Publishing waits until the transaction has committed
+        try:
+            mind = await run_write(save)
+        except Exception:
+            if spatial_data_id is not None:
+                await delete_spatial_data(spatial_data_id, object_type='mind')
+            raise
         
-        redis_client = redis.from_url(REDIS_URL)
-        await redis_client.publish(CHANNEL_MIND_UPDATES, json.dumps(mind))
-        await redis_client.close()
+        await app.state.redis.publish(CHANNEL_MIND_UPDATES, orjson.dumps(mind))
         
-        return UpsertMindResponse(
+        return StructResponse(UpsertMindResponse(
             message="Mind saved successfully",
             mind=MindResponse(**mind)
-        )
+        ))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -270,56 +458,52 @@ async def upsert_mind_endpoint(request: MindUpsert):
 @app.get("/api/minds")
 async def list_minds_endpoint():
     try:
-        _, root = get_connection()
-        minds = list_minds_zodb(root)
+        with get_db().transaction() as conn:
+            minds = await list_minds_zodb(conn.root())
         return {"minds": minds, "count": len(minds)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/append_mental", response_model=MentalSphereResponse)
-async def append_mental_endpoint(request: MentalSphereRequest):
+@app.post("/api/append_mental")
+async def append_mental_endpoint(request: MentalSphereRequest = Depends(json_body(MentalSphereRequest))):
     try:
-        _, root = get_connection()
+        async def add(root):
+            return add_mental_spheres_to_mind(root, request.mind_id, request.sphere_id)
         
-        mental_sphere_ids = add_mental_spheres_to_mind(
-            root, request.mind_id, request.sphere_id
-        )
+        mental_sphere_ids = await run_write(add)
         
-        return MentalSphereResponse(
+        return StructResponse(MentalSphereResponse(
             message="Mental spheres added successfully",
             mind_id=request.mind_id,
             mental_sphere_ids=list(mental_sphere_ids)
-        )
+        ))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/remove_mental", response_model=MentalSphereResponse)
-async def remove_mental_endpoint(request: MentalSphereRequest):
+@app.post("/api/remove_mental")
+async def remove_mental_endpoint(request: MentalSphereRequest = Depends(json_body(MentalSphereRequest))):
     try:
-        _, root = get_connection()
+        async def remove(root):
+            return delete_mental_spheres_from_mind(root, request.mind_id, request.sphere_id)
         
-        mental_sphere_ids = delete_mental_spheres_from_mind(
-            root, request.mind_id, request.sphere_id
-        )
+        mental_sphere_ids = await run_write(remove)
         
-        return MentalSphereResponse(
+        return StructResponse(MentalSphereResponse(
             message="Mental spheres removed successfully",
             mind_id=request.mind_id,
             mental_sphere_ids=list(mental_sphere_ids)
-        )
+        ))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/", response_class=HTMLResponse)
-async def get_homepage():
-    return """
+_HOME_HTML = """
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -623,8 +807,19 @@ async def get_homepage():
 </body>
 </html>
 """
+_HOME_BYTES = _HOME_HTML.encode("utf-8")
+_HOME_HEADERS = {
+    "content-length": str(len(_HOME_BYTES)),
+    "cache-control": "public, max-age=300"
+}
+
+
+@app.get("/", response_class=HTMLResponse)
+async def get_homepage():
+    return Response(content=_HOME_BYTES, media_type="text/html", headers=_HOME_HEADERS)
 
 
 if __name__ == "__main__":
     import uvicorn
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     uvicorn.run(app, host="0.0.0.0", port=8000)
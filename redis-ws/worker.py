@@ -1,200 +1,427 @@
 import asyncio
-import json
-import httpx
+import itertools
+import logging
+import os
+import socket
+import time
+from datetime import datetime
+import msgspec
+import orjson
 import redis.asyncio as redis
+import transaction
+from BTrees.OOBTree import OOBTree
+from ZODB.POSException import ConflictError
 
-import os
-from app.config import REDIS_URL, CHANNEL_TASKS, CHANNEL_TASK_RESULTS
+from app.config import REDIS_URL, CHANNEL_TASK_RESULTS, CHANNEL_MIND_UPDATES, STREAM_TASKS, TASKS_GROUP
+from app.schemas import MindUpsert, GetMindRequest, MentalSphereRequest, TaskResult
+from app.mind_helpers import (
+    create_mind_spatial, create_mind_zodb, update_mind_zodb, get_mind_zodb, get_minds_zodb, list_minds_zodb,
+    add_mental_spheres_to_mind, delete_mental_spheres_from_mind
+)
+from app.database import delete_spatial_data, pool as db_pool
+from zodb_module.zodb_management import COMMIT_ATTEMPTS, get_db, get_connection, init_zodb, close_zodb
+
+TASK_QUEUE_SIZE = 1000
+BATCH_MAX = 64
+BATCH_WINDOW = 0.02
+RECONNECT_BACKOFF_MIN = 1.0
+RECONNECT_BACKOFF_MAX = 30.0
+STREAM_BLOCK_MS = 1000
+READ_CONCURRENCY = 32
+REPLAY_BACKOFF_MIN = 0.5
+REPLAY_BACKOFF_MAX = 30.0
+CLAIM_IDLE_MS = 60000
+CLAIM_INTERVAL = 30.0
+PROCESSED_RETENTION_MS = 24 * 3600 * 1000
+PROCESSED_PRUNE_MAX = 1000
+
+# Unique per process, so two workers on one host never share a pending list;
+# entries a dead consumer left unacknowledged are claimed after CLAIM_IDLE_MS
+CONSUMER_NAME = os.getenv("WORKER_NAME", f"{socket.gethostname()}-{os.getpid()}")
+
+WRITE_ACTIONS = {"upsert_mind", "append_mental", "remove_mental"}
+READ_ACTIONS = {"get_mind", "list_minds"}
 
-BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+logger = logging.getLogger("mindsim.worker")
+
+
+async def _do_upsert(data: dict, root, now: datetime, state: dict) -> dict:
+    request = msgspec.convert(data, MindUpsert)
+    mind_data = {
+        'name': request.name,
+        'detail': request.detail,
+        'color': request.color,
+        'rec_status': request.rec_status,
+        'position': request.position,
+        'rotation': request.rotation,
+        'scale': request.scale,
+        'created_by': 1
+    }
+    
+    if request.id:
+        mind_id = await update_mind_zodb(root, request.id, mind_data, now)
+    else:
+        # A conflict retry reuses the row inserted by the earlier attempt
+        if 'spatial_data_id' not in state:
+            state['spatial_data_id'] = await create_mind_spatial(mind_data)
+        mind_id = await create_mind_zodb(root, mind_data, now, spatial_data_id=state['spatial_data_id'])
+    
+    mind = await get_mind_zodb(root, mind_id)
+    return {"message": "Mind saved successfully", "mind": mind}
 
 
-async def process_task(task: dict, http_client: httpx.AsyncClient) -> dict:
+async def _do_get(data: dict, root, now: datetime, state: dict) -> dict:
+    request = msgspec.convert({"mind_id_list": data.get("mind_id_list", [])}, GetMindRequest)
+    minds = await get_minds_zodb(root, request.mind_id_list)
+    return {"minds": minds, "count": len(minds)}
+
+
+async def _do_list(data: dict, root, now: datetime, state: dict) -> dict:
+    minds = await list_minds_zodb(root)
+    return {"minds": minds, "count": len(minds)}
+
+
+def _sphere_action(mutate, message: str):
+    async def handler(data: dict, root, now: datetime, state: dict) -> dict:
+        request = msgspec.convert(
+            {"mind_id": data.get("mind_id"), "sphere_id": data.get("sphere_id", [])}, MentalSphereRequest
+        )
+        mental_sphere_ids = mutate(root, request.mind_id, request.sphere_id, now)
+        return {
+            "message": message,
+            "mind_id": request.mind_id,
+            "mental_sphere_ids": list(mental_sphere_ids)
+        }
+    
+    return handler
+
+
+# action -> (handler, debug summary of its result)
+ACTIONS = {
+    "upsert_mind": (_do_upsert, lambda r: f"saved mind {r['mind']['id']}"),
+    "get_mind": (_do_get, lambda r: f"found {r['count']} minds"),
+    "list_minds": (_do_list, lambda r: f"listed {r['count']} minds"),
+    "append_mental": (
+        _sphere_action(add_mental_spheres_to_mind, "Mental spheres added successfully"),
+        lambda r: f"added spheres to mind {r['mind_id']}"
+    ),
+    "remove_mental": (
+        _sphere_action(delete_mental_spheres_from_mind, "Mental spheres removed successfully"),
+        lambda r: f"removed spheres from mind {r['mind_id']}"
+    ),
+}
+
+
+async def process_task(task: dict, root, now: datetime, state: dict) -> TaskResult:
     action = task.get("action")
     data = task.get("data", {})
     request_id = task.get("request_id")
     
-    print(f"Processing: {action} (request_id: {request_id})")
+    entry = ACTIONS.get(action)
+    if entry is None:
+        return TaskResult("error", action, request_id, error=f"Unknown action: {action}")
     
+    handler, summarize = entry
     try:
-        if action == "upsert_mind":
-            response = await http_client.post(
-                f"{BACKEND_URL}/api/upsert_mind",
-                json=data,
-                timeout=30.0
-            )
-            result = response.json()
-            
-            if response.status_code == 200:
-                print(f"  {result.get('message')} (id: {result['mind']['id']})")
-                return {
-                    "status": "success",
-                    "action": action,
-                    "request_id": request_id,
-                    "data": result
-                }
-            else:
-                return {
-                    "status": "error",
-                    "action": action,
-                    "request_id": request_id,
-                    "error": result.get("detail", "Unknown error")
-                }
-        
-        elif action == "get_mind":
-            response = await http_client.post(
-                f"{BACKEND_URL}/api/get_mind",
-                json={"mind_id_list": data.get("mind_id_list", [])},
-                timeout=30.0
-            )
-            result = response.json()
-            
-            if response.status_code == 200:
-                print(f"  Found {result['count']} minds")
-                return {
-                    "status": "success",
-                    "action": action,
-                    "request_id": request_id,
-                    "data": result
-                }
-            else:
-                return {
-                    "status": "error",
-                    "action": action,
-                    "request_id": request_id,
-                    "error": result.get("detail", "Unknown error")
-                }
+        result = await handler(data, root, now, state)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s request_id=%s: %s", action, request_id, summarize(result))
+        return TaskResult("success", action, request_id, data=result)
+    except Exception as e:
+        logger.info("%s failed (request_id=%s): %s", action, request_id, e)
+        return TaskResult("error", action, request_id, error=str(e))
+
+
+async def collect_batch(queue: asyncio.Queue) -> list:
+    loop = asyncio.get_running_loop()
+    batch = [await queue.get()]
+    deadline = loop.time() + BATCH_WINDOW
+    
+    while len(batch) < BATCH_MAX:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout))
+        except asyncio.TimeoutError:
+            break
+    
+    return batch
+
+
+async def discard_spatial(states: list):
+    """Delete the PostGIS rows inserted for writes that were rolled back"""
+    for state in states:
+        spatial_data_id = state.pop('spatial_data_id', None)
+        if spatial_data_id is None:
+            continue
+        try:
+            await delete_spatial_data(spatial_data_id, object_type='mind')
+        except Exception as e:
+            logger.warning("Could not delete spatial row %s: %s", spatial_data_id, e)
+
+
+def processed_entries(root) -> OOBTree:
+    """Results of committed write entries, keyed by (ms, seq) of their stream id"""
+    tree = getattr(root, 'processed_entries', None)
+    if tree is None:
+        tree = root.processed_entries = OOBTree()
+    return tree
+
+
+def entry_key(entry_id) -> tuple:
+    if isinstance(entry_id, bytes):
+        entry_id = entry_id.decode()
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+def prune_processed(processed: OOBTree):
+    # Bounded per batch so a large backlog of old records is trimmed gradually
+    cutoff = (int(time.time() * 1000) - PROCESSED_RETENTION_MS, 0)
+    stale = list(itertools.islice(processed.keys(max=cutoff, excludemax=True), PROCESSED_PRUNE_MAX))
+    for key in stale:
+        del processed[key]
+
+
+async def run_batch(batch: list, connection) -> list:
+    # One transaction per batch; a savepoint per task keeps failures isolated.
+    # begin() picks up other clients' commits while the connection keeps its cache.
+    # Each result is recorded under its entry id in the same transaction, so a
+    # redelivered entry whose acknowledgement was lost is answered, not re-run.
+    tm = connection.transaction_manager
+    now = datetime.now()
+    # Per-task state outlives conflict retries, e.g. spatial rows already inserted
+    states = [{} for _ in batch]
+    
+    for attempt in range(1, COMMIT_ATTEMPTS + 1):
+        tm.begin()
+        root = connection.root()
+        processed = processed_entries(root)
+        results = []
         
-        elif action == "list_minds":
-            response = await http_client.get(
-                f"{BACKEND_URL}/api/minds",
-                timeout=30.0
-            )
-            result = response.json()
+        for (entry_id, task), state in zip(batch, states):
+            key = entry_key(entry_id)
+            recorded = processed.get(key)
+            if recorded is not None:
+                results.append(msgspec.json.decode(recorded, type=TaskResult))
+                continue
             
-            if response.status_code == 200:
-                print(f"  Listed {result['count']} minds")
-                return {
-                    "status": "success",
-                    "action": action,
-                    "request_id": request_id,
-                    "data": result
-                }
-            else:
-                return {
-                    "status": "error",
-                    "action": action,
-                    "request_id": request_id,
-                    "error": result.get("detail", "Unknown error")
-                }
+            savepoint = tm.savepoint()
+            result = await process_task(task, root, now, state)
+            if result.status != "success":
+                savepoint.rollback()
+                await discard_spatial([state])
+            processed[key] = msgspec.json.encode(result)
+            results.append(result)
         
-        elif action == "append_mental":
-            response = await http_client.post(
-                f"{BACKEND_URL}/api/append_mental",
-                json={
-                    "mind_id": data.get("mind_id"),
-                    "sphere_id": data.get("sphere_id", [])
-                },
-                timeout=30.0
-            )
-            result = response.json()
-            
-            if response.status_code == 200:
-                print(f"  Added spheres to mind {result['mind_id']}")
-                return {
-                    "status": "success",
-                    "action": action,
-                    "request_id": request_id,
-                    "data": result
-                }
-            else:
-                return {
-                    "status": "error",
-                    "action": action,
-                    "request_id": request_id,
-                    "error": result.get("detail", "Unknown error")
-                }
+        prune_processed(processed)
         
-        elif action == "remove_mental":
-            response = await http_client.post(
-                f"{BACKEND_URL}/api/remove_mental",
-                json={
-                    "mind_id": data.get("mind_id"),
-                    "sphere_id": data.get("sphere_id", [])
-                },
-                timeout=30.0
-            )
-            result = response.json()
-            
-            if response.status_code == 200:
-                print(f"  Removed spheres from mind {result['mind_id']}")
-                return {
-                    "status": "success",
-                    "action": action,
-                    "request_id": request_id,
-                    "data": result
-                }
-            else:
-                return {
-                    "status": "error",
-                    "action": action,
-                    "request_id": request_id,
-                    "error": result.get("detail", "Unknown error")
-                }
+        try:
+            tm.commit()
+            break
+        except ConflictError as e:
+            tm.abort()
+            if attempt < COMMIT_ATTEMPTS:
+                logger.info("Write conflict on batch of %d, retrying (%d/%d)", len(batch), attempt, COMMIT_ATTEMPTS)
+                continue
+            error = e
+        except Exception as e:
+            tm.abort()
+            error = e
         
+        logger.error("Commit failed for batch of %d: %s", len(batch), error)
+        await discard_spatial(states)
+        results = [
+            TaskResult("error", r.action, r.request_id, error=str(error))
+            if r.status == "success" and r.action in WRITE_ACTIONS else r
+            for r in results
+        ]
+        break
+    
+    connection.cacheGC()
+    return results
+
+
+async def run_read(task: dict, semaphore: asyncio.Semaphore) -> TaskResult:
+    # Reads run concurrently, so each gets its own pooled connection and snapshot
+    async with semaphore:
+        with get_db().transaction() as read_connection:
+            return await process_task(task, read_connection.root(), datetime.now(), {})
+
+
+def split_runs(entries: list) -> list:
+    """Group consecutive (entry_id, task) pairs into (is_read, entries) runs, keeping arrival order"""
+    runs = []
+    for entry in entries:
+        is_read = entry[1].get("action") in READ_ACTIONS
+        if runs and runs[-1][0] == is_read:
+            runs[-1][1].append(entry)
         else:
-            return {
-                "status": "error",
-                "action": action,
-                "request_id": request_id,
-                "error": f"Unknown action: {action}"
-            }
+            runs.append((is_read, [entry]))
+    return runs
+
+
+async def commit_batches(queue: asyncio.Queue, connection, redis_client: redis.Redis,
+                         inflight: set, replay: asyncio.Event):
+    semaphore = asyncio.Semaphore(READ_CONCURRENCY)
+    failures = 0
+    while True:
+        batch = await collect_batch(queue)
+        try:
+            # Runs execute in order, so a read never overtakes an earlier write;
+            # consecutive reads fan out, consecutive writes share one transaction
+            results = []
+            for is_read, entries in split_runs(batch):
+                if is_read:
+                    results.extend(await asyncio.gather(*(run_read(task, semaphore) for _, task in entries)))
+                else:
+                    results.extend(await run_batch(entries, connection))
             
-    except Exception as e:
-        print(f"  Error: {e}")
-        return {
-            "status": "error",
-            "action": action,
-            "request_id": request_id,
-            "error": str(e)
-        }
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.xack(STREAM_TASKS, TASKS_GROUP, *[entry_id for entry_id, _ in batch])
+                for result in results:
+                    pipe.publish(CHANNEL_TASK_RESULTS, msgspec.json.encode(result))
+                    if result.action == "upsert_mind" and result.status == "success":
+                        pipe.publish(CHANNEL_MIND_UPDATES, msgspec.json.encode(result.data["mind"]))
+                await pipe.execute()
+            logger.debug("published %d results", len(results))
+            failures = 0
+        except Exception as e:
+            # The entries stay unacknowledged; ask the reader to replay them,
+            # backing off while the same failure keeps recurring
+            delay = min(REPLAY_BACKOFF_MIN * 2 ** failures, REPLAY_BACKOFF_MAX)
+            failures += 1
+            logger.exception("Batch failed, replaying in %.1fs: %s", delay, e)
+            await asyncio.sleep(delay)
+            replay.set()
+        finally:
+            inflight.difference_update(entry_id for entry_id, _ in batch)
+
+
+async def ensure_group(redis_client: redis.Redis):
+    try:
+        await redis_client.xgroup_create(STREAM_TASKS, TASKS_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def claim_stale(redis_client: redis.Redis) -> int:
+    """Take over entries left pending by consumers idle for CLAIM_IDLE_MS; returns how many"""
+    claimed = 0
+    start_id = "0-0"
+    while True:
+        start_id, entries, *_ = await redis_client.xautoclaim(
+            STREAM_TASKS, TASKS_GROUP, CONSUMER_NAME, CLAIM_IDLE_MS, start_id=start_id, count=BATCH_MAX
+        )
+        claimed += len(entries)
+        if start_id in (b"0-0", "0-0"):
+            break
+    
+    # Names are per process, so drop consumers that left nothing behind
+    for consumer in await redis_client.xinfo_consumers(STREAM_TASKS, TASKS_GROUP):
+        if consumer["pending"] == 0 and consumer["idle"] > CLAIM_IDLE_MS:
+            await redis_client.xgroup_delconsumer(STREAM_TASKS, TASKS_GROUP, consumer["name"])
+    
+    return claimed
+
+
+async def read_tasks(redis_client: redis.Redis, queue: asyncio.Queue, stream_id: str, inflight: set) -> str:
+    """Queue one XREADGROUP worth of entries; returns the id to read from next"""
+    response = await redis_client.xreadgroup(
+        TASKS_GROUP, CONSUMER_NAME, {STREAM_TASKS: stream_id},
+        count=BATCH_MAX, block=STREAM_BLOCK_MS
+    )
+    entries = response[0][1] if response else []
+    if not entries:
+        # Backlog replay is done once the pending list is exhausted
+        return ">"
+    
+    invalid = []
+    for entry_id, fields in entries:
+        if entry_id in inflight:
+            # Replayed from the pending list but still queued locally
+            continue
+        try:
+            task = orjson.loads(fields[b"data"])
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            logger.warning("Invalid task entry %s: %r", entry_id, fields)
+            invalid.append(entry_id)
+            continue
+        inflight.add(entry_id)
+        await queue.put((entry_id, task))
+    
+    if invalid:
+        await redis_client.xack(STREAM_TASKS, TASKS_GROUP, *invalid)
+    
+    return stream_id if stream_id == ">" else entries[-1][0]
 
 
 async def worker_main():
-    print("MindSim Background Worker")
-    print("=" * 40)
+    logger.info("MindSim Background Worker starting")
     
+    connection = redis_client = committer = None
     try:
-        redis_client = redis.from_url(REDIS_URL)
-        pubsub = redis_client.pubsub()
+        init_zodb()
+        await db_pool.open()
+        # One long-lived connection with its own transaction manager keeps the object cache warm
+        connection, _ = get_connection(transaction.TransactionManager())
         
-        await pubsub.subscribe(CHANNEL_TASKS)
-        print(f"Subscribed to: {CHANNEL_TASKS}")
-        print("Waiting for tasks...\n")
+        # One client for the worker's lifetime; its pool reconnects on demand
+        redis_client = redis.from_url(REDIS_URL, decode_responses=False, health_check_interval=30)
         
-        async with httpx.AsyncClient() as http_client:
-            async for message in pubsub.listen():
-                if message["type"] == "message":
-                    try:
-                        task = json.loads(message["data"])
-                        result = await process_task(task, http_client)
-                        
-                        await redis_client.publish(CHANNEL_TASK_RESULTS, json.dumps(result))
-                        print(f"Result published for: {result.get('request_id')}\n")
-                        
-                    except json.JSONDecodeError:
-                        print(f"Invalid JSON: {message['data']}")
-                    except Exception as e:
-                        print(f"Error: {e}")
-                    
-    except redis.ConnectionError:
-        print("Could not connect to Redis. Is it running?")
-    except KeyboardInterrupt:
-        print("\nWorker shutting down...")
+        tasks = asyncio.Queue(maxsize=TASK_QUEUE_SIZE)
+        # Entry ids queued but not yet acknowledged, and a flag the committer
+        # raises when a batch could not be acknowledged
+        inflight = set()
+        replay = asyncio.Event()
+        committer = asyncio.create_task(
+            commit_batches(tasks, connection, redis_client, inflight, replay)
+        )
+        
+        # "0" replays entries this consumer read but never acknowledged
+        stream_id = "0"
+        backoff = RECONNECT_BACKOFF_MIN
+        loop = asyncio.get_running_loop()
+        next_claim = 0.0
+        while True:
+            try:
+                await ensure_group(redis_client)
+                logger.info("Consuming %s as %s/%s", STREAM_TASKS, TASKS_GROUP, CONSUMER_NAME)
+                backoff = RECONNECT_BACKOFF_MIN
+                
+                while True:
+                    if loop.time() >= next_claim:
+                        next_claim = loop.time() + CLAIM_INTERVAL
+                        claimed = await claim_stale(redis_client)
+                        if claimed:
+                            logger.info("Claimed %d stale entries", claimed)
+                            replay.set()
+                    if replay.is_set():
+                        replay.clear()
+                        stream_id = "0"
+                    stream_id = await read_tasks(redis_client, tasks, stream_id, inflight)
+            except redis.ConnectionError as e:
+                # Anything read before the drop may never have been acknowledged
+                stream_id = "0"
+                logger.warning("Redis unavailable (%s), retrying in %.0fs", e, backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+    
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        logger.info("Worker shutting down...")
     finally:
-        await pubsub.unsubscribe(CHANNEL_TASKS)
-        await redis_client.close()
+        if committer is not None:
+            committer.cancel()
+        if redis_client is not None:
+            await redis_client.aclose()
+        if connection is not None:
+            connection.close()
+        await db_pool.close()
+        close_zodb()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(worker_main())
@@ -3,6 +3,7 @@ ZODB Persistent Objects
 """
 
 import persistent
+from BTrees.LLBTree import LLTreeSet
 
 
 class MentalSphereObject(persistent.Persistent):
@@ -52,7 +53,8 @@ class MindObject(persistent.Persistent):
         self.rec_status = rec_status
         self.spatial_data_id = spatial_data_id
         self.created_by = created_by
-        self.mental_sphere_ids = mental_sphere_ids if mental_sphere_ids else []
+        # 64-bit set: sphere ids come from Date.now() on the client
+        self.mental_sphere_ids = LLTreeSet(mental_sphere_ids or ())
         self.created_at = created_at
         self.updated_at = created_at
 
@@ -62,7 +64,7 @@ class MindObject(persistent.Persistent):
     def get_color(self): return self.color
     def get_rec_status(self): return self.rec_status
     def get_created_by(self): return self.created_by
-    def get_mental_sphere_ids(self): return self.mental_sphere_ids
+    def get_mental_sphere_ids(self): return list(self.mental_sphere_ids)
     def get_created_at(self): return self.created_at
     def get_updated_at(self): return self.updated_at
     def get_spatial_data_id(self): return self.spatial_data_id
@@ -76,10 +78,25 @@ class MindObject(persistent.Persistent):
     def set_updated_at(self, updated_at): self.updated_at = updated_at
     def set_spatial_data_id(self, spatial_data_id): self.spatial_data_id = spatial_data_id
 
+    def _sphere_set(self):
+        # Older minds hold a list or a 32-bit IITreeSet; convert on first write
+        if not isinstance(self.mental_sphere_ids, LLTreeSet):
+            self.mental_sphere_ids = LLTreeSet(self.mental_sphere_ids)
+        return self.mental_sphere_ids
+
     def add_mental_sphere(self, sphere_id):
-        if sphere_id not in self.mental_sphere_ids:
-            self.mental_sphere_ids.append(sphere_id)
+        self._sphere_set().insert(sphere_id)
+
+    def add_mental_spheres(self, sphere_ids):
+        self._sphere_set().update(sphere_ids)
 
     def remove_mental_sphere(self, sphere_id):
-        if sphere_id in self.mental_sphere_ids:
-            self.mental_sphere_ids.remove(sphere_id)
+        sphere_set = self._sphere_set()
+        if sphere_id in sphere_set:
+            sphere_set.remove(sphere_id)
+
+    def remove_mental_spheres(self, sphere_ids):
+        sphere_set = self._sphere_set()
+        for sphere_id in sphere_ids:
+            if sphere_id in sphere_set:
+                sphere_set.remove(sphere_id)
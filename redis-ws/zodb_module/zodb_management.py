@@ -6,6 +6,7 @@ import os
 import ZODB
 import ZODB.FileStorage
 from ZODB.blob import BlobStorage
+from ZEO.ClientStorage import ClientStorage
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 ZODB_DIR = os.path.join(BASE_DIR, 'zodb_data')
@@ -16,6 +17,22 @@ os.makedirs(BLOB_DIR, exist_ok=True)
 
 ZODB_FILE = os.path.join(ZODB_DIR, 'zodb.fs')
 
+# "host:port" of a ZEO server; lets the backend and worker share one storage
+ZEO_ADDRESS = os.getenv('ZEO_ADDRESS')
+BLOB_CACHE_DIR = os.path.join(ZODB_DIR, 'blob_cache')
+# The ZEO server's own blob directory, when mounted locally; blobs are then read in place
+ZEO_BLOB_DIR = os.getenv('ZEO_BLOB_DIR')
+ZEO_CACHE_SIZE = int(os.getenv('ZEO_CACHE_SIZE', str(500 * 1024 * 1024)))
+# Naming the client keeps its cache on disk across restarts; each process needs its own name
+ZEO_CLIENT = os.getenv('ZEO_CLIENT')
+ZEO_CACHE_DIR = os.path.join(ZODB_DIR, 'zeo_cache')
+# Tries per transaction when a commit hits a write conflict with another client
+COMMIT_ATTEMPTS = 3
+# Objects kept per connection cache
+CACHE_SIZE = int(os.getenv('ZODB_CACHE_SIZE', '100000'))
+# Pooled connections kept open; the worker runs up to 32 reads at once beside its write connection
+POOL_SIZE = int(os.getenv('ZODB_POOL_SIZE', '33'))
+
 file_storage = None
 storage = None
 db = None
@@ -25,20 +42,35 @@ def init_zodb():
     global file_storage, storage, db
     
     if db is None:
-        file_storage = ZODB.FileStorage.FileStorage(ZODB_FILE)
-        storage = BlobStorage(BLOB_DIR, file_storage)
-        db = ZODB.DB(storage)
+        if ZEO_ADDRESS:
+            host, port = ZEO_ADDRESS.rsplit(':', 1)
+            if ZEO_CLIENT:
+                os.makedirs(ZEO_CACHE_DIR, exist_ok=True)
+            storage = ClientStorage(
+                (host, int(port)),
+                blob_dir=ZEO_BLOB_DIR or BLOB_CACHE_DIR,
+                shared_blob_dir=bool(ZEO_BLOB_DIR),
+                cache_size=ZEO_CACHE_SIZE,
+                client=ZEO_CLIENT,
+                var=ZEO_CACHE_DIR
+            )
+        else:
+            file_storage = ZODB.FileStorage.FileStorage(ZODB_FILE)
+            storage = BlobStorage(BLOB_DIR, file_storage)
+        db = ZODB.DB(storage, pool_size=POOL_SIZE, cache_size=CACHE_SIZE)
     
     return db
 
 
-def get_connection():
-    global db
-    
+def get_db():
+    """Shared DB; `with get_db().transaction() as conn:` reuses pooled connections and their caches"""
     if db is None:
         init_zodb()
-    
-    connection = db.open()
+    return db
+
+
+def get_connection(transaction_manager=None):
+    connection = get_db().open(transaction_manager)
     root = connection.root()
     return connection, root
 